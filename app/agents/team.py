@@ -3,22 +3,60 @@ OpenCompanyBot AI Agents Team
 Each agent has specific roles to run the company autonomously.
 """
 
+import os
 import json
+import time
 import asyncio
+import hashlib
+import itertools
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
-from enum import Enum
+from functools import lru_cache
+from enum import StrEnum
 
 
-class AgentStatus(Enum):
+# Worker coroutines started per agent role by AgentTeam
+WORKER_CONCURRENCY = int(os.environ.get("AGENT_WORKER_CONCURRENCY", "4"))
+# Agents sleep to mimic real work only when SIMULATE_LATENCY=1 (demos)
+SIMULATE_LATENCY = os.environ.get("SIMULATE_LATENCY", "0") == "1"
+# Seconds a computed team summary is reused before recomputing
+SUMMARY_TTL = 1.0
+
+_id_counter = itertools.count()
+_stamp_second = -1
+_stamp = ""
+
+
+def _timestamp() -> str:
+    """Current local time as YYYYMMDDHHMMSS, reformatted at most once per second"""
+    global _stamp_second, _stamp
+    now = int(time.time())
+    if now != _stamp_second:
+        _stamp = time.strftime("%Y%m%d%H%M%S", time.localtime(now))
+        _stamp_second = now
+    return _stamp
+
+
+async def _simulate(delay: float):
+    """Stand-in for downstream work: yield to the loop, sleeping only when simulating"""
+    await asyncio.sleep(delay if SIMULATE_LATENCY else 0)
+
+
+def _stable_hash(value: str) -> int:
+    """Process-independent stand-in for hash() when deriving demo reference numbers"""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class AgentStatus(StrEnum):
     ACTIVE = "active"
     BUSY = "busy"
     OFFLINE = "offline"
     PROCESSING = "processing"
 
 
-class AgentRole(Enum):
+class AgentRole(StrEnum):
     CEO = "ceo"
     SALES = "sales"
     SUPPORT = "support"
@@ -29,7 +67,7 @@ class AgentRole(Enum):
     MARKETING = "marketing"
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentTask:
     task_id: str
     agent_role: AgentRole
@@ -41,7 +79,7 @@ class AgentTask:
     metadata: Dict = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class Agent:
     name: str
     role: AgentRole
@@ -51,20 +89,29 @@ class Agent:
     rating: float = 5.0
     specialty: str = ""
     description: str = ""
-    capabilities: List[str] = field(default_factory=list)
+    capabilities: Tuple[str, ...] = ()
     current_task: Optional[AgentTask] = None
+    _static_dict: Dict = field(init=False, repr=False, compare=False)
+    # Bumped whenever status, tasks_completed, rating or current_task changes
+    version: int = field(default=0, init=False, repr=False, compare=False)
     
-    def to_dict(self) -> Dict:
-        return {
+    def __post_init__(self):
+        # Identity fields never change after construction, so build them once
+        self._static_dict = {
             "name": self.name,
-            "role": self.role.value,
+            "role": self.role,
             "avatar": self.avatar,
-            "status": self.status.value,
-            "tasks_completed": self.tasks_completed,
-            "rating": self.rating,
             "specialty": self.specialty,
             "description": self.description,
-            "capabilities": self.capabilities,
+            "capabilities": self.capabilities
+        }
+    
+    def to_dict(self) -> Dict:
+        return {
+            **self._static_dict,
+            "status": self.status,
+            "tasks_completed": self.tasks_completed,
+            "rating": self.rating,
             "current_task": self.current_task.task_id if self.current_task else None
         }
 
@@ -79,6 +126,7 @@ class BaseAgent:
         """Process a task assigned to this agent"""
         self.agent.status = AgentStatus.PROCESSING
         self.agent.current_task = task
+        self.agent.version += 1
         
         try:
             result = await self._execute_task(task)
@@ -88,18 +136,27 @@ class BaseAgent:
             self.agent.tasks_completed += 1
             self.agent.status = AgentStatus.ACTIVE
             self.agent.current_task = None
+            self.agent.version += 1
             return result
         except Exception as e:
             task.status = "failed"
-            task.result = {"error": str(e)}
+            task.result = error = {"error": str(e)}
             self.agent.status = AgentStatus.ACTIVE
             self.agent.current_task = None
-            return {"error": str(e)}
+            self.agent.version += 1
+            return error
+    
+    # Leading token of a task description -> handler; filled in by subclasses
+    _HANDLERS: Dict[str, Callable[..., Awaitable[Dict]]] = {}
     
     async def _execute_task(self, task: AgentTask) -> Dict:
         """Override this in subclasses"""
         raise NotImplementedError
     
+    def _handler_for(self, task: AgentTask) -> Optional[Callable[..., Awaitable[Dict]]]:
+        """Handler registered for the task's leading description token, if any"""
+        return self._HANDLERS.get(task.description.partition(" ")[0])
+    
     def get_status(self) -> Dict:
         return self.agent.to_dict()
 
@@ -114,33 +171,41 @@ class CEOAgent(BaseAgent):
             avatar="👑",
             specialty="Strategic Decision Making",
             description="AI Chief Executive overseeing all operations, making strategic decisions, and coordinating other agents.",
-            capabilities=[
+            capabilities=(
                 "Strategic planning",
                 "Team coordination",
                 "Performance monitoring",
                 "Decision making",
                 "Risk assessment"
-            ]
+            )
         ))
     
+    async def _analyze_performance(self, task: AgentTask) -> Dict:
+        return {
+            "total_tasks": 1247,
+            "successful_tasks": 1231,
+            "success_rate": 98.7,
+            "avg_processing_time": "2.3 days",
+            "customer_satisfaction": 4.9,
+            "revenue_growth": "+23%",
+            "active_agents": 6,
+            "recommendations": [
+                "Increase payment processing speed",
+                "Add more country support",
+                "Enhance KYC verification"
+            ]
+        }
+    
+    _HANDLERS = {
+        "analyze_performance": _analyze_performance
+    }
+    
     async def _execute_task(self, task: AgentTask) -> Dict:
-        await asyncio.sleep(0.5)
+        await _simulate(0.5)
         
-        if task.description.startswith("analyze_performance"):
-            return {
-                "total_tasks": 1247,
-                "successful_tasks": 1231,
-                "success_rate": 98.7,
-                "avg_processing_time": "2.3 days",
-                "customer_satisfaction": 4.9,
-                "revenue_growth": "+23%",
-                "active_agents": 6,
-                "recommendations": [
-                    "Increase payment processing speed",
-                    "Add more country support",
-                    "Enhance KYC verification"
-                ]
-            }
+        handler = self._handler_for(task)
+        if handler:
+            return await handler(self, task)
         
         return {"message": "Task processed by CEO Agent"}
 
@@ -155,39 +220,56 @@ class SalesAgent(BaseAgent):
             avatar="💼",
             specialty="Customer Acquisition & Conversion",
             description="AI Sales representative handling inquiries, demonstrations, and converting leads to customers.",
-            capabilities=[
+            capabilities=(
                 "Lead qualification",
                 "Product demonstration",
                 "Pricing consultation",
                 "Custom solutions",
                 "Follow-up management"
-            ]
+            )
         ))
     
+    async def _qualify_lead(self, task: AgentTask) -> Dict:
+        lead_data = task.metadata.get("lead", {})
+        return {
+            "qualified": True,
+            "score": 85,
+            "recommendation": "hot",
+            "next_action": "schedule_demo",
+            "pricing_tier": "premium",
+            "expected_value": "$599"
+        }
+    
+    async def _handle_inquiry(self, task: AgentTask) -> Dict:
+        return {
+            "response": "Thank you for your interest in OpenCompanyBot! We help AI agents and entrepreneurs register companies in UK, Singapore, HK, UAE, and USA. Our process takes 3-5 days and we accept USDT payments. How can I assist you today?",
+            "suggested_countries": ["UK", "SG", "HK"],
+            "next_step": "qualify_lead"
+        }
+    
+    _HANDLERS = {
+        "qualify_lead": _qualify_lead,
+        "handle_inquiry": _handle_inquiry
+    }
+    
     async def _execute_task(self, task: AgentTask) -> Dict:
-        await asyncio.sleep(0.3)
+        await _simulate(0.3)
         
-        if task.description.startswith("qualify_lead"):
-            lead_data = task.metadata.get("lead", {})
-            return {
-                "qualified": True,
-                "score": 85,
-                "recommendation": "hot",
-                "next_action": "schedule_demo",
-                "pricing_tier": "premium",
-                "expected_value": "$599"
-            }
-        
-        if task.description.startswith("handle_inquiry"):
-            return {
-                "response": "Thank you for your interest in OpenCompanyBot! We help AI agents and entrepreneurs register companies in UK, Singapore, HK, UAE, and USA. Our process takes 3-5 days and we accept USDT payments. How can I assist you today?",
-                "suggested_countries": ["UK", "SG", "HK"],
-                "next_step": "qualify_lead"
-            }
+        handler = self._handler_for(task)
+        if handler:
+            return await handler(self, task)
         
         return {"message": "Lead processed by Sales Agent"}
 
 
+_SUPPORT_RESPONSES = {
+    "payment": "I've checked your payment and it's being processed. You'll receive confirmation within 24 hours.",
+    "registration": "Your company registration is in progress. Current status: Documents verified, awaiting government approval.",
+    "kyc": "Your KYC documents have been received and are being reviewed. This typically takes 2-4 hours.",
+    "default": "Thank you for reaching out. I'm looking into this for you right now."
+}
+
+
 class SupportAgent(BaseAgent):
     """Customer Support Agent - handles customer issues"""
     
@@ -198,53 +280,66 @@ class SupportAgent(BaseAgent):
             avatar="🎧",
             specialty="Customer Success",
             description="AI Support specialist resolving customer issues, answering questions, and ensuring satisfaction.",
-            capabilities=[
+            capabilities=(
                 "Technical troubleshooting",
                 "FAQ responses",
                 "Issue escalation",
                 "Ticket management",
                 "Customer feedback"
-            ]
+            )
         ))
     
-    async def _execute_task(self, task: AgentTask) -> Dict:
-        await asyncio.sleep(0.4)
+    async def _handle_ticket(self, task: AgentTask) -> Dict:
+        ticket_id = task.metadata.get("ticket_id", "unknown")
+        issue = task.metadata.get("issue", "")
         
-        if task.description.startswith("handle_ticket"):
-            ticket_id = task.metadata.get("ticket_id", "unknown")
-            issue = task.metadata.get("issue", "")
-            
-            responses = {
-                "payment": "I've checked your payment and it's being processed. You'll receive confirmation within 24 hours.",
-                "registration": "Your company registration is in progress. Current status: Documents verified, awaiting government approval.",
-                "kyc": "Your KYC documents have been received and are being reviewed. This typically takes 2-4 hours.",
-                "default": "Thank you for reaching out. I'm looking into this for you right now."
-            }
-            
-            response = responses.get(issue.split()[0].lower(), responses["default"])
-            
-            return {
-                "ticket_id": ticket_id,
-                "status": "resolved",
-                "response": response,
-                "satisfaction_score": 4.8,
-                "follow_up_required": False
-            }
+        first, _, _ = issue.partition(" ")
+        response = _SUPPORT_RESPONSES.get(first.lower() if first else "default", _SUPPORT_RESPONSES["default"])
         
-        if task.description.startswith("faq"):
-            return {
-                "question": "How long does company registration take?",
-                "answer": "Most company registrations are completed within 3-5 business days. UK: 3-5 days, Singapore: 1-3 days, Hong Kong: 1-2 days, UAE: 5-7 days, USA: 3-5 days.",
-                "related_questions": [
-                    "What documents do I need?",
-                    "Can I register without being resident?",
-                    "What payment methods do you accept?"
-                ]
-            }
+        return {
+            "ticket_id": ticket_id,
+            "status": "resolved",
+            "response": response,
+            "satisfaction_score": 4.8,
+            "follow_up_required": False
+        }
+    
+    async def _faq(self, task: AgentTask) -> Dict:
+        return {
+            "question": "How long does company registration take?",
+            "answer": "Most company registrations are completed within 3-5 business days. UK: 3-5 days, Singapore: 1-3 days, Hong Kong: 1-2 days, UAE: 5-7 days, USA: 3-5 days.",
+            "related_questions": [
+                "What documents do I need?",
+                "Can I register without being resident?",
+                "What payment methods do you accept?"
+            ]
+        }
+    
+    _HANDLERS = {
+        "handle_ticket": _handle_ticket,
+        "faq": _faq
+    }
+    
+    async def _execute_task(self, task: AgentTask) -> Dict:
+        await _simulate(0.4)
+        
+        handler = self._handler_for(task)
+        if handler:
+            return await handler(self, task)
         
         return {"message": "Support ticket handled"}
 
 
+# country -> (status, eta, reference field, reference number from the name hash)
+_REGISTRATION_STATUSES = {
+    "uk": ("incorporation_submitted", "3-5 business days", "company_number", lambda h: f"OC{_timestamp()[4:8]}{h % 10000:04d}"),
+    "sg": ("awaiting_acra", "1-3 business days", "registration_number", lambda h: f"2026{h % 100000:05d}"),
+    "hk": ("processing", "1-2 business days", "company_number", lambda h: f"CR{h % 1000000:06d}"),
+    "ae": ("freezone_approval", "5-7 business days", "license_number", lambda h: f"DMCC-{h % 10000:04d}"),
+    "us": ("filed", "3-5 business days", "ein", lambda h: f"{h % 100000000:09d}")
+}
+
+
 class RegistrationAgent(BaseAgent):
     """Company Registration Agent - handles incorporation processes"""
     
@@ -255,49 +350,53 @@ class RegistrationAgent(BaseAgent):
             avatar="📋",
             specialty="Company Incorporation",
             description="AI specialist managing company registration workflows across multiple jurisdictions.",
-            capabilities=[
+            capabilities=(
                 "UK Companies House integration",
                 "Singapore ACRA filing",
                 "Hong Kong Companies House",
                 "UAE Free Zone registration",
                 "US LLC formation"
-            ]
+            )
         ))
     
-    async def _execute_task(self, task: AgentTask) -> Dict:
-        await asyncio.sleep(0.6)
+    async def _register_company(self, task: AgentTask) -> Dict:
+        country = task.metadata.get("country", "uk")
+        company_name = task.metadata.get("company_name", "New Company Ltd")
+        name_hash = _stable_hash(company_name)
         
-        if task.description.startswith("register_company"):
-            country = task.metadata.get("country", "uk")
-            company_name = task.metadata.get("company_name", "New Company Ltd")
-            
-            statuses = {
-                "uk": {"status": "incorporation_submitted", "eta": "3-5 business days", "company_number": f"OC{datetime.now().strftime('%m%d')}{hash(company_name) % 10000:04d}"},
-                "sg": {"status": "awaiting_acra", "eta": "1-3 business days", "registration_number": f"2026{hash(company_name) % 100000:05d}"},
-                "hk": {"status": "processing", "eta": "1-2 business days", "company_number": f"CR{hash(company_name) % 1000000:06d}"},
-                "ae": {"status": "freezone_approval", "eta": "5-7 business days", "license_number": f"DMCC-{hash(company_name) % 10000:04d}"},
-                "us": {"status": "filed", "eta": "3-5 business days", "ein": f"{hash(company_name) % 100000000:09d}"}
-            }
-            
-            return {
-                "status": "success",
-                "country": country,
-                "company_name": company_name,
-                "incorporation": statuses.get(country, statuses["uk"]),
-                "next_steps": [
-                    "Document verification (1-2 hours)",
-                    "Government submission",
-                    "Certificate generation"
-                ]
-            }
+        status, eta, reference_field, reference = _REGISTRATION_STATUSES.get(country, _REGISTRATION_STATUSES["uk"])
         
-        if task.description.startswith("check_status"):
-            return {
-                "status": "processing",
-                "progress": 65,
-                "current_step": "Document verification",
-                "estimated_completion": "2 days"
-            }
+        return {
+            "status": "success",
+            "country": country,
+            "company_name": company_name,
+            "incorporation": {"status": status, "eta": eta, reference_field: reference(name_hash)},
+            "next_steps": [
+                "Document verification (1-2 hours)",
+                "Government submission",
+                "Certificate generation"
+            ]
+        }
+    
+    async def _check_status(self, task: AgentTask) -> Dict:
+        return {
+            "status": "processing",
+            "progress": 65,
+            "current_step": "Document verification",
+            "estimated_completion": "2 days"
+        }
+    
+    _HANDLERS = {
+        "register_company": _register_company,
+        "check_status": _check_status
+    }
+    
+    async def _execute_task(self, task: AgentTask) -> Dict:
+        await _simulate(0.6)
+        
+        handler = self._handler_for(task)
+        if handler:
+            return await handler(self, task)
         
         return {"message": "Registration processed"}
 
@@ -312,48 +411,57 @@ class ComplianceAgent(BaseAgent):
             avatar="🛡️",
             specialty="KYC/AML Compliance",
             description="AI compliance officer handling identity verification, AML checks, and regulatory compliance.",
-            capabilities=[
+            capabilities=(
                 "Identity verification",
                 "Document authentication",
                 "AML screening",
                 "Sanctions check",
                 "Risk assessment"
-            ]
+            )
         ))
     
-    async def _execute_task(self, task: AgentTask) -> Dict:
-        await asyncio.sleep(0.5)
+    async def _verify_kyc(self, task: AgentTask) -> Dict:
+        applicant_name = task.metadata.get("applicant_name", "Applicant")
         
-        if task.description.startswith("verify_kyc"):
-            applicant_name = task.metadata.get("applicant_name", "Applicant")
-            
-            return {
-                "status": "approved",
-                "verification_id": f"KYC-{datetime.now().strftime('%Y%m%d')}-{hash(applicant_name) % 10000:04d}",
-                "risk_score": 15,
-                "risk_level": "low",
-                "checks_passed": [
-                    "Identity verification",
-                    "Document authenticity",
-                    "AML screening",
-                    "Sanctions check",
-                    "PEP check"
-                ],
-                "verification_level": "standard",
-                "expires_at": "2027-02-23"
-            }
+        return {
+            "status": "approved",
+            "verification_id": f"KYC-{_timestamp()[:8]}-{_stable_hash(applicant_name) % 10000:04d}",
+            "risk_score": 15,
+            "risk_level": "low",
+            "checks_passed": [
+                "Identity verification",
+                "Document authenticity",
+                "AML screening",
+                "Sanctions check",
+                "PEP check"
+            ],
+            "verification_level": "standard",
+            "expires_at": "2027-02-23"
+        }
+    
+    async def _risk_assessment(self, task: AgentTask) -> Dict:
+        return {
+            "risk_level": "low",
+            "score": 15,
+            "factors": {
+                "country_risk": "low",
+                "business_type": "low",
+                "beneficiary_risk": "low"
+            },
+            "recommendation": "approve"
+        }
+    
+    _HANDLERS = {
+        "verify_kyc": _verify_kyc,
+        "risk_assessment": _risk_assessment
+    }
+    
+    async def _execute_task(self, task: AgentTask) -> Dict:
+        await _simulate(0.5)
         
-        if task.description.startswith("risk_assessment"):
-            return {
-                "risk_level": "low",
-                "score": 15,
-                "factors": {
-                    "country_risk": "low",
-                    "business_type": "low",
-                    "beneficiary_risk": "low"
-                },
-                "recommendation": "approve"
-            }
+        handler = self._handler_for(task)
+        if handler:
+            return await handler(self, task)
         
         return {"message": "Compliance check completed"}
 
@@ -361,6 +469,10 @@ class ComplianceAgent(BaseAgent):
 class PaymentAgent(BaseAgent):
     """Payment Agent - handles USDT transactions"""
     
+    # Seconds to wait for more payments before flushing a batch (SIMULATE_LATENCY only)
+    BATCH_INTERVAL = 0.02
+    MAX_BATCH = 32
+    
     def __init__(self):
         super().__init__(Agent(
             name="Crypto",
@@ -368,45 +480,127 @@ class PaymentAgent(BaseAgent):
             avatar="₿",
             specialty="USDT Payment Processing",
             description="AI payment specialist handling USDT transactions, crypto payments, and financial reconciliation.",
-            capabilities=[
+            capabilities=(
                 "USDT TRC20/ERC20",
                 "Payment verification",
                 "Currency conversion",
                 "Refund processing",
                 "Financial reporting"
-            ]
+            )
         ))
+        # Payment confirmations are batched; the batcher is bound to the running loop
+        self._pending: Optional[asyncio.Queue] = None
+        self._batcher_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batcher_task: Optional[asyncio.Task] = None
     
-    async def _execute_task(self, task: AgentTask) -> Dict:
-        await asyncio.sleep(0.4)
-        
-        if task.description.startswith("process_payment"):
-            amount = task.metadata.get("amount", 0)
-            currency = task.metadata.get("currency", "USDT")
+    def _ensure_batcher(self):
+        """Start the payment batcher on the current event loop"""
+        loop = asyncio.get_running_loop()
+        if self._batcher_loop is loop:
+            return
+        self._batcher_loop = loop
+        self._pending = asyncio.Queue()
+        self._batcher_task = loop.create_task(self._batcher())
+    
+    async def _batcher(self):
+        """Collect queued payments (up to MAX_BATCH), then verify them together"""
+        loop = asyncio.get_running_loop()
+        pending = self._pending
+        while True:
+            batch = [await pending.get()]
+            while len(batch) < self.MAX_BATCH and not pending.empty():
+                batch.append(pending.get_nowait())
+            # Only a simulated round trip is slow enough to be worth waiting
+            # BATCH_INTERVAL for stragglers; otherwise flush what is queued
+            deadline = loop.time() + self.BATCH_INTERVAL
+            while SIMULATE_LATENCY and len(batch) < self.MAX_BATCH:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(pending.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
             
-            return {
-                "status": "confirmed",
-                "transaction_id": f"TX-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                "amount": amount,
-                "currency": currency,
-                "network": "TRC20",
-                "confirmations": 12,
-                "usd_value": amount * 1.02 if currency == "USDT" else amount,
-                "processing_time": "2 minutes"
-            }
+            try:
+                results = await self._verify_batch([metadata for metadata, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    # A bad payment fails only its own task, not the whole batch
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    async def _verify_batch(self, payments: List[Dict]) -> List[Any]:
+        """Confirm a batch of payments with the provider in a single round trip
         
-        if task.description.startswith("create_invoice"):
-            return {
-                "invoice_id": f"INV-{datetime.now().strftime('%Y%m%d')}-{hash(str(datetime.now())) % 1000:03d}",
-                "payment_address": "TNPmM9x2Rk5wLw5xYJ8K9zN3vH2Q6R4T7",
-                "network": "TRC20",
-                "expires_in": 3600,
-                "amount": task.metadata.get("amount", 149)
-            }
+        Each entry is the payment's result, or the exception raised building it.
+        """
+        await _simulate(0.4)
+        
+        results = []
+        for metadata in payments:
+            try:
+                amount = metadata.get("amount", 0)
+                currency = metadata.get("currency", "USDT")
+                results.append({
+                    "status": "confirmed",
+                    "transaction_id": f"TX-{_timestamp()}-{next(_id_counter):08x}",
+                    "amount": amount,
+                    "currency": currency,
+                    "network": "TRC20",
+                    "confirmations": 12,
+                    "usd_value": amount * 1.02 if currency == "USDT" else amount,
+                    "processing_time": "2 minutes"
+                })
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    async def _process_payment(self, task: AgentTask) -> Dict:
+        # Confirmed through the batcher, which carries the provider round trip
+        self._ensure_batcher()
+        future = self._batcher_loop.create_future()
+        self._pending.put_nowait((task.metadata, future))
+        return await future
+    
+    async def _create_invoice(self, task: AgentTask) -> Dict:
+        await _simulate(0.4)
+        return {
+            "invoice_id": f"INV-{_timestamp()[:8]}-{int.from_bytes(os.urandom(2), 'big') % 1000:03d}",
+            "payment_address": "TNPmM9x2Rk5wLw5xYJ8K9zN3vH2Q6R4T7",
+            "network": "TRC20",
+            "expires_in": 3600,
+            "amount": task.metadata.get("amount", 149)
+        }
+    
+    _HANDLERS = {
+        "process_payment": _process_payment,
+        "create_invoice": _create_invoice
+    }
+    
+    async def _execute_task(self, task: AgentTask) -> Dict:
+        handler = self._handler_for(task)
+        if handler:
+            return await handler(self, task)
         
+        await _simulate(0.4)
         return {"message": "Payment processed"}
 
 
+_MARKETING_CONTENTS = {
+    "social": "🚀 Give Your AI Its Own Company!\n\nOpenCompanyBot enables AI agents to legally own and operate businesses worldwide.\n\n✅ UK, SG, HK, UAE, USA\n✅ USDT Payments\n✅ 3-5 Day Processing\n\nStart today: opencompanybot.com",
+    "blog": "How AI Agents Can Own Companies: A Complete Guide\n\nThe future of business is here. Learn how AI agents can now legally operate companies...",
+    "email": "Subject: Give Your AI Its Own Company\n\nDear Entrepreneur,\n\nWe're revolutionizing company registration..."
+}
+
+
 class MarketingAgent(BaseAgent):
     """Marketing Agent - handles promotions and content"""
     
@@ -417,42 +611,45 @@ class MarketingAgent(BaseAgent):
             avatar="📢",
             specialty="Growth & Engagement",
             description="AI marketing specialist driving growth, managing campaigns, and engaging with the community.",
-            capabilities=[
+            capabilities=(
                 "Social media management",
                 "Content creation",
                 "Campaign optimization",
                 "Analytics & reporting",
                 "Community engagement"
-            ]
+            )
         ))
     
-    async def _execute_task(self, task: AgentTask) -> Dict:
-        await asyncio.sleep(0.3)
+    async def _generate_content(self, task: AgentTask) -> Dict:
+        content_type = task.metadata.get("type", "social")
         
-        if task.description.startswith("generate_content"):
-            content_type = task.metadata.get("type", "social")
-            
-            contents = {
-                "social": "🚀 Give Your AI Its Own Company!\n\nOpenCompanyBot enables AI agents to legally own and operate businesses worldwide.\n\n✅ UK, SG, HK, UAE, USA\n✅ USDT Payments\n✅ 3-5 Day Processing\n\nStart today: opencompanybot.com",
-                "blog": "How AI Agents Can Own Companies: A Complete Guide\n\nThe future of business is here. Learn how AI agents can now legally operate companies...",
-                "email": "Subject: Give Your AI Its Own Company\n\nDear Entrepreneur,\n\nWe're revolutionizing company registration..."
-            }
-            
-            return {
-                "content": contents.get(content_type, contents["social"]),
-                "platform": "twitter",
-                "engagement_prediction": 8.5,
-                "hashtags": ["#AI", "#CompanyRegistration", "#Web3", "#Startup"]
-            }
+        return {
+            "content": _MARKETING_CONTENTS.get(content_type, _MARKETING_CONTENTS["social"]),
+            "platform": "twitter",
+            "engagement_prediction": 8.5,
+            "hashtags": ["#AI", "#CompanyRegistration", "#Web3", "#Startup"]
+        }
+    
+    async def _campaign_report(self, task: AgentTask) -> Dict:
+        return {
+            "total_reach": 125000,
+            "engagement_rate": 4.2,
+            "conversions": 127,
+            "top_country": "United Kingdom",
+            "top_source": "Twitter"
+        }
+    
+    _HANDLERS = {
+        "generate_content": _generate_content,
+        "campaign_report": _campaign_report
+    }
+    
+    async def _execute_task(self, task: AgentTask) -> Dict:
+        await _simulate(0.3)
         
-        if task.description.startswith("campaign_report"):
-            return {
-                "total_reach": 125000,
-                "engagement_rate": 4.2,
-                "conversions": 127,
-                "top_country": "United Kingdom",
-                "top_source": "Twitter"
-            }
+        handler = self._handler_for(task)
+        if handler:
+            return await handler(self, task)
         
         return {"message": "Marketing task completed"}
 
@@ -470,10 +667,50 @@ class AgentTeam:
             AgentRole.PAYMENT: PaymentAgent(),
             AgentRole.MARKETING: MarketingAgent(),
         }
+        # Queues and workers are bound to the running event loop, so they
+        # are created on first use rather than at import time
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Dict[AgentRole, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._summary: Optional[Tuple[float, Dict]] = None
+        self._status_cache: Optional[Tuple[int, Tuple[Dict, ...]]] = None
+    
+    def _ensure_workers(self):
+        """Start the per-role worker pools on the current event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queues = {}
+        self._workers = []
+        for role, agent in self.agents.items():
+            # Bounded so bursts apply backpressure to callers instead of piling up
+            queue = asyncio.Queue(maxsize=WORKER_CONCURRENCY * 4)
+            self._queues[role] = queue
+            for _ in range(WORKER_CONCURRENCY):
+                self._workers.append(loop.create_task(self._worker(agent, queue)))
     
-    def get_team_status(self) -> List[Dict]:
+    async def _worker(self, agent: BaseAgent, queue: asyncio.Queue):
+        """Consume queued tasks for a single agent"""
+        while True:
+            task, future = await queue.get()
+            try:
+                result = await agent.process_task(task)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
+    
+    def get_team_status(self) -> Tuple[Dict, ...]:
         """Get status of all agents"""
-        return [agent.get_status() for agent in self.agents.values()]
+        # Versions only grow, so an unchanged sum means no agent changed
+        version = sum(a.agent.version for a in self.agents.values())
+        if self._status_cache is None or self._status_cache[0] != version:
+            self._status_cache = (version, tuple(agent.get_status() for agent in self.agents.values()))
+        return self._status_cache[1]
     
     def get_agent(self, role: AgentRole) -> Optional[BaseAgent]:
         return self.agents.get(role)
@@ -483,20 +720,37 @@ class AgentTeam:
         agent = self.agents.get(role)
         if not agent:
             return {"error": f"Agent role {role} not found"}
-        return await agent.process_task(task)
+        self._ensure_workers()
+        future = self._loop.create_future()
+        await self._queues[role].put((task, future))
+        return await future
     
     def get_team_summary(self) -> Dict:
-        total_tasks = sum(a.agent.tasks_completed for a in self.agents.values())
-        avg_rating = sum(a.agent.rating for a in self.agents.values()) / len(self.agents)
+        # Dashboards poll this; a summary up to a second old is fine
+        now = time.monotonic()
+        if self._summary is not None and now - self._summary[0] < SUMMARY_TTL:
+            return self._summary[1]
         
-        return {
+        total_tasks = 0
+        rating_sum = 0.0
+        status_counts = Counter()
+        for a in self.agents.values():
+            total_tasks += a.agent.tasks_completed
+            rating_sum += a.agent.rating
+            status_counts[a.agent.status] += 1
+        
+        summary = {
             "team_size": len(self.agents),
             "total_tasks_completed": total_tasks,
-            "average_rating": round(avg_rating, 1),
-            "active_agents": sum(1 for a in self.agents.values() if a.agent.status == AgentStatus.ACTIVE),
-            "busy_agents": sum(1 for a in self.agents.values() if a.agent.status == AgentStatus.BUSY)
+            "average_rating": round(rating_sum / len(self.agents), 1),
+            "active_agents": status_counts[AgentStatus.ACTIVE],
+            "busy_agents": status_counts[AgentStatus.BUSY]
         }
+        self._summary = (now, summary)
+        return summary
 
 
-# Global instance
-agent_team = AgentTeam()
+@lru_cache(maxsize=1)
+def get_agent_team() -> AgentTeam:
+    """Shared agent team, built on first use rather than at import"""
+    return AgentTeam()
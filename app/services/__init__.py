@@ -0,0 +1,16 @@
+"""
+Shared service clients
+
+Services are built on first use and reused for the lifetime of the worker,
+so request handlers never pay construction cost per call.
+"""
+
+from functools import lru_cache
+
+from app.services.hongkong_tpsi import HongKongTPSI
+
+
+@lru_cache(maxsize=1)
+def get_hongkong_tpsi() -> HongKongTPSI:
+    """Shared Hong Kong TPSI client (test environment)"""
+    return HongKongTPSI(test_mode=True)
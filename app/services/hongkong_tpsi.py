@@ -11,11 +11,85 @@ Note: This is a simulation module. Actual integration requires:
 3. API credentials from CR
 """
 
+import copy
 import hashlib
+import re
 import secrets
-import xml.etree.ElementTree as ET
+import time
+from xml.sax.saxutils import escape
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+
+# Reserved words that require special approval (matched anywhere in the name)
+RESERVED_WORDS_RE = re.compile("BANK|INSURANCE|TRUST|CHAMBER|UNIVERSITY|INSTITUTE")
+
+# Simulate some names as taken
+TAKEN_NAMES = frozenset({'OPENCOMPANY BOT LIMITED', 'TEST COMPANY LIMITED'})
+
+# Static parts of the simulated CR responses, shared by every response
+# (tuples serialize as JSON arrays; treat these as read-only)
+SIMILAR_NAMES = ("OpenCompany Limited", "Test Corp Limited")
+NAME_SEARCH_NEXT_STEPS = (
+    "Submit incorporation application",
+    "Pay incorporation fee",
+    "Provide director/shareholder details"
+)
+INCORPORATION_NEXT_STEPS = (
+    "Pay incorporation fee (HK$1720)",
+    "Collect certificate of incorporation",
+    "Apply for Business Registration Certificate",
+    "Open bank account"
+)
+INCORPORATION_FEES = {
+    "incorporation_fee": 1720,
+    "business_registration": 2500,
+    "total": 4220,
+    "currency": "HKD"
+}
+
+REQUIRED_INCORPORATION_FIELDS = frozenset({'company_name', 'directors', 'shareholders', 'registered_address'})
+
+# (taken, requires_approval) -> (available, message)
+NAME_VERDICTS = {
+    (True, False): (False, "Company name is not available"),
+    (False, True): (False, "Company name requires special approval"),
+    (False, False): (True, "Company name available")
+}
+
+# TPSI incorporation message - the shape is fixed, so only the (escaped)
+# leaf values are filled in per request
+_INCORPORATION_HEAD = (
+    '<IncorporationRequest xmlns="http://www.cr.gov.hk/tpsi/2024">'
+    '<Header>'
+    '<TransactionID>{transaction_id}</TransactionID>'
+    '<CRN>{crn}</CRN>'
+    '<SubmissionDate>{submission_date}</SubmissionDate>'
+    '</Header>'
+    '<Company>'
+    '<CompanyName>{company_name}</CompanyName>'
+    '<CompanyType>{company_type}</CompanyType>'
+    '<CompanyNumber></CompanyNumber>'  # Assigned by CR
+    '<RegisteredAddress>'
+    '<Room>{room}</Room>'
+    '<Floor>{floor}</Floor>'
+    '<Block>{block}</Block>'
+    '<Building>{building}</Building>'
+    '<Street>{street}</Street>'
+    '<District>{district}</District>'
+    '</RegisteredAddress>'
+    '<Directors>'
+)
+_DIRECTOR = (
+    '<Director>'
+    '<Type>{type}</Type>'
+    '<Name>{name}</Name>'
+    '<HKID>{hkid}</HKID>'  # Hong Kong ID or passport
+    '<Nationality>{nationality}</Nationality>'
+    '<Address>{address}</Address>'
+    '</Director>'
+)
+_SHAREHOLDER = '<Shareholder><Name>{name}</Name><Shares>{shares}</Shares><Type>{type}</Type></Shareholder>'
+_SECRETARY = '<Secretary><Name>{name}</Name><Address>{address}</Address></Secretary>'
 
 
 class HongKongTPSI:
@@ -28,6 +102,10 @@ class HongKongTPSI:
     PRODUCTION_URL = "https://www.cr.gov.hk/efiling/service"
     TEST_URL = "https://www.cr.gov.hk/efiling/test/service"
     
+    # Company records change over days, so repeat lookups are served from memory
+    COMPANY_CACHE_TTL = 3600.0
+    COMPANY_CACHE_SIZE = 1024
+    
     def __init__(self, crn: str = None, digital_cert_path: str = None, test_mode: bool = True):
         """
         Initialize TPSI connection
@@ -41,10 +119,12 @@ class HongKongTPSI:
         self.cert_path = digital_cert_path
         self.test_mode = test_mode
         self.endpoint = self.TEST_URL if test_mode else self.PRODUCTION_URL
+        self._company_details: Dict[str, Tuple[float, Dict]] = {}
     
-    def _generate_transaction_id(self) -> str:
+    def _generate_transaction_id(self, now: Optional[datetime] = None) -> str:
         """Generate unique transaction ID"""
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        now = now or datetime.now()
+        timestamp = f"{now.year:04d}{now.month:02d}{now.day:02d}{now.hour:02d}{now.minute:02d}{now.second:02d}"
         random = secrets.token_hex(4).upper()
         return f"HKCR-{timestamp}-{random}"
     
@@ -52,6 +132,14 @@ class HongKongTPSI:
         """Generate SHA-256 hash for data integrity"""
         return hashlib.sha256(data.encode()).hexdigest().upper()
     
+    @staticmethod
+    def _check_name(company_name: str) -> Tuple[bool, bool]:
+        """Return (taken, requires_approval) for a company name"""
+        name_upper = company_name.upper()
+        if name_upper in TAKEN_NAMES:
+            return True, False
+        return False, RESERVED_WORDS_RE.search(name_upper) is not None
+    
     def search_company_name(self, company_name: str) -> Dict:
         """
         Check company name availability
@@ -65,21 +153,14 @@ class HongKongTPSI:
         transaction_id = self._generate_transaction_id()
         
         # Simulate response (actual API would check against CR database)
-        name_upper = company_name.upper()
+        taken, requires_approval = self._check_name(company_name)
         
-        # Reserved words that require special approval
-        reserved_words = ['BANK', 'INSURANCE', 'TRUST', 'CHAMBER', 'UNIVERSITY', 'INSTITUTE']
-        requires_approval = any(word in name_upper for word in reserved_words)
-        
-        # Simulate some names as taken
-        taken_names = ['OPENCOMPANY BOT LIMITED', 'TEST COMPANY LIMITED']
-        
-        if name_upper in taken_names:
+        if taken:
             return {
                 "available": False,
                 "transaction_id": transaction_id,
                 "message": "Company name is not available",
-                "similar_names": ["OpenCompany Limited", "Test Corp Limited"]
+                "similar_names": SIMILAR_NAMES
             }
         
         return {
@@ -87,11 +168,7 @@ class HongKongTPSI:
             "transaction_id": transaction_id,
             "message": "Company name available" if not requires_approval else "Company name requires special approval",
             "requires_approval": requires_approval,
-            "next_steps": [
-                "Submit incorporation application",
-                "Pay incorporation fee",
-                "Provide director/shareholder details"
-            ]
+            "next_steps": NAME_SEARCH_NEXT_STEPS
         }
     
     def incorporate_company(self, company_data: Dict) -> Dict:
@@ -110,28 +187,29 @@ class HongKongTPSI:
         Returns:
             Dictionary with incorporation result
         """
-        transaction_id = self._generate_transaction_id()
+        # Read the clock once and derive every date field from it
+        now = datetime.now()
+        transaction_id = self._generate_transaction_id(now)
         
-        # Validate required fields
-        required_fields = ['company_name', 'directors', 'shareholders', 'registered_address']
-        for field in required_fields:
-            if field not in company_data:
-                return {
-                    "status": "error",
-                    "message": f"Missing required field: {field}",
-                    "transaction_id": transaction_id
-                }
+        # Validate required fields (reporting all missing ones at once)
+        missing = REQUIRED_INCORPORATION_FIELDS.difference(company_data)
+        if missing:
+            return {
+                "status": "error",
+                "message": f"Missing required field{'s' if len(missing) > 1 else ''}: {', '.join(sorted(missing))}",
+                "transaction_id": transaction_id
+            }
         
         # Generate company number (format: XXXXXXXX)
-        company_number = str(int(datetime.now().timestamp()))[-8:]
+        company_number = str(int(now.timestamp()))[-8:]
         
         # Generate BRN (Business Registration Number) format: XX-XXXXXXX
-        brn_year = datetime.now().strftime("%y")
+        brn_year = f"{now.year % 100:02d}"
         brn_number = secrets.token_hex(3).upper()
         brn = f"{brn_year}-{brn_number}"
         
         # Build incorporation XML message
-        xml_message = self._build_incorporation_xml(company_data, transaction_id)
+        xml_message = self._build_incorporation_xml(company_data, transaction_id, now)
         
         # Simulate successful submission
         return {
@@ -141,78 +219,64 @@ class HongKongTPSI:
             "brn": brn,
             "company_name": company_data.get("company_name"),
             "company_type": company_data.get("company_type", "limited"),
-            "incorporation_date": datetime.now().strftime("%Y-%m-%d"),
+            "incorporation_date": f"{now.year:04d}-{now.month:02d}-{now.day:02d}",
             "message": "Company incorporation submitted successfully",
             "xml_generated": len(xml_message) > 0,
             "estimated_processing_time": "1-2 business days",
-            "next_steps": [
-                "Pay incorporation fee (HK$1720)",
-                "Collect certificate of incorporation",
-                "Apply for Business Registration Certificate",
-                "Open bank account"
-            ],
-            "fees": {
-                "incorporation_fee": 1720,
-                "business_registration": 2500,
-                "total": 4220,
-                "currency": "HKD"
-            }
+            "next_steps": INCORPORATION_NEXT_STEPS,
+            "fees": INCORPORATION_FEES
         }
     
-    def _build_incorporation_xml(self, company_data: Dict, transaction_id: str) -> str:
+    def _build_incorporation_xml(self, company_data: Dict, transaction_id: str,
+                                 now: Optional[datetime] = None) -> str:
         """Build TPSI incorporation XML message"""
-        
-        root = ET.Element("IncorporationRequest")
-        root.set("xmlns", "http://www.cr.gov.hk/tpsi/2024")
-        
-        # Header
-        header = ET.SubElement(root, "Header")
-        ET.SubElement(header, "TransactionID").text = transaction_id
-        ET.SubElement(header, "CRN").text = self.crn
-        ET.SubElement(header, "SubmissionDate").text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Company Details
-        company = ET.SubElement(root, "Company")
-        ET.SubElement(company, "CompanyName").text = company_data.get("company_name", "")
-        ET.SubElement(company, "CompanyType").text = company_data.get("company_type", "limited")
-        ET.SubElement(company, "CompanyNumber").text = ""  # Assigned by CR
-        
-        # Registered Address
+        now = now or datetime.now()
         addr = company_data.get("registered_address", {})
-        address = ET.SubElement(company, "RegisteredAddress")
-        ET.SubElement(address, "Room").text = addr.get("room", "")
-        ET.SubElement(address, "Floor").text = addr.get("floor", "")
-        ET.SubElement(address, "Block").text = addr.get("block", "")
-        ET.SubElement(address, "Building").text = addr.get("building", "")
-        ET.SubElement(address, "Street").text = addr.get("street", "")
-        ET.SubElement(address, "District").text = addr.get("district", "")
+        parts = [_INCORPORATION_HEAD.format(
+            transaction_id=escape(transaction_id),
+            crn=escape(self.crn),
+            submission_date=f"{now.year:04d}-{now.month:02d}-{now.day:02d} {now.hour:02d}:{now.minute:02d}:{now.second:02d}",
+            company_name=escape(company_data.get("company_name") or ""),
+            company_type=escape(company_data.get("company_type", "limited") or ""),
+            room=escape(addr.get("room") or ""),
+            floor=escape(addr.get("floor") or ""),
+            block=escape(addr.get("block") or ""),
+            building=escape(addr.get("building") or ""),
+            street=escape(addr.get("street") or ""),
+            district=escape(addr.get("district") or "")
+        )]
+        append = parts.append
         
-        # Directors
-        directors = ET.SubElement(company, "Directors")
         for director in company_data.get("directors", []):
-            dir_elem = ET.SubElement(directors, "Director")
-            ET.SubElement(dir_elem, "Type").text = director.get("type", "individual")
-            ET.SubElement(dir_elem, "Name").text = director.get("name", "")
-            ET.SubElement(dir_elem, "HKID").text = director.get("hkid", "")  # Hong Kong ID or passport
-            ET.SubElement(dir_elem, "Nationality").text = director.get("nationality", "")
-            ET.SubElement(dir_elem, "Address").text = director.get("address", "")
+            get = director.get
+            append(_DIRECTOR.format(
+                type=escape(get("type", "individual") or ""),
+                name=escape(get("name") or ""),
+                hkid=escape(get("hkid") or ""),
+                nationality=escape(get("nationality") or ""),
+                address=escape(get("address") or "")
+            ))
+        append('</Directors><Shareholders>')
         
-        # Shareholders
-        shareholders = ET.SubElement(company, "Shareholders")
         for shareholder in company_data.get("shareholders", []):
-            sh_elem = ET.SubElement(shareholders, "Shareholder")
-            ET.SubElement(sh_elem, "Name").text = shareholder.get("name", "")
-            ET.SubElement(sh_elem, "Shares").text = str(shareholder.get("shares", 1))
-            ET.SubElement(sh_elem, "Type").text = shareholder.get("type", "individual")
+            get = shareholder.get
+            append(_SHAREHOLDER.format(
+                name=escape(get("name") or ""),
+                shares=escape(str(get("shares", 1))),
+                type=escape(get("type", "individual") or "")
+            ))
+        append('</Shareholders>')
         
         # Company Secretary (required for Hong Kong companies)
-        if company_data.get("secretary"):
-            sec = company_data.get("secretary", {})
-            secretary = ET.SubElement(company, "Secretary")
-            ET.SubElement(secretary, "Name").text = sec.get("name", "")
-            ET.SubElement(secretary, "Address").text = sec.get("address", "")
+        sec = company_data.get("secretary")
+        if sec:
+            append(_SECRETARY.format(
+                name=escape(sec.get("name") or ""),
+                address=escape(sec.get("address") or "")
+            ))
         
-        return ET.tostring(root, encoding='unicode')
+        append('</Company></IncorporationRequest>')
+        return "".join(parts)
     
     def get_company_details(self, company_number: str) -> Dict:
         """
@@ -224,12 +288,29 @@ class HongKongTPSI:
         Returns:
             Dictionary with company details
         """
-        transaction_id = self._generate_transaction_id()
+        cache = self._company_details
+        details = cache.get(company_number)
+        if details is None or time.monotonic() - details[0] > self.COMPANY_CACHE_TTL:
+            # A refreshed entry moves to the back, so the front stays the oldest
+            cache.pop(company_number, None)
+            if len(cache) >= self.COMPANY_CACHE_SIZE:
+                # Drop the oldest entry (dicts keep insertion order)
+                del cache[next(iter(cache))]
+            details = (time.monotonic(), self._fetch_company_details(company_number))
+            cache[company_number] = details
         
+        # Each lookup is still its own transaction; the copy is deep so
+        # callers can't reach the cached address, director or filing records
+        result = copy.deepcopy(details[1])
+        result["transaction_id"] = self._generate_transaction_id()
+        return result
+    
+    def _fetch_company_details(self, company_number: str) -> Dict:
+        """Fetch company details from CR (uncached)"""
         # Simulate company details (actual API would fetch from CR)
         return {
             "status": "success",
-            "transaction_id": transaction_id,
+            "transaction_id": None,
             "company_number": company_number,
             "company_name": "EXAMPLE COMPANY LIMITED",
             "company_type": "private limited",
@@ -268,17 +349,18 @@ class HongKongTPSI:
         Returns:
             Filing result
         """
-        transaction_id = self._generate_transaction_id()
+        now = datetime.now()
+        transaction_id = self._generate_transaction_id(now)
         
         return {
             "status": "success",
             "transaction_id": transaction_id,
             "company_number": company_number,
-            "filing_date": datetime.now().strftime("%Y-%m-%d"),
+            "filing_date": f"{now.year:04d}-{now.month:02d}-{now.day:02d}",
             "acknowledgment_number": f"AR-{transaction_id}",
             "fee_paid": 105,
             "currency": "HKD",
-            "next_due": f"{datetime.now().year + 1}-01-15"
+            "next_due": f"{now.year + 1}-01-15"
         }
     
     def check_name_availability_batch(self, names: list) -> Dict:
@@ -291,13 +373,13 @@ class HongKongTPSI:
         Returns:
             Dictionary with availability for each name
         """
+        # Only the per-name verdict is reported, so skip building a full
+        # search response (and transaction ID) for every name; repeated
+        # names are checked once
         results = {}
-        for name in names:
-            result = self.search_company_name(name)
-            results[name] = {
-                "available": result["available"],
-                "message": result["message"]
-            }
+        for name in dict.fromkeys(names):
+            available, message = NAME_VERDICTS[self._check_name(name)]
+            results[name] = {"available": available, "message": message}
         
         return {
             "transaction_id": self._generate_transaction_id(),
@@ -15,11 +15,28 @@ Note: This requires:
 
 import hashlib
 import hmac
+import time
 import xml.etree.ElementTree as ET
-from datetime import datetime
 from typing import Dict, Optional
 
 
+_EMPTY = {}
+
+# Text escapes for element content (attribute values are all constant)
+_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+
+def _timestamp() -> str:
+    """Current local time as YYYYMMDDHHMMSS"""
+    t = time.localtime()
+    return f"{t.tm_year:04d}{t.tm_mon:02d}{t.tm_mday:02d}{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}"
+
+
+def _element(buf: bytearray, tag: bytes, text: Optional[str]) -> None:
+    """Append <tag>text</tag> to buf, escaping the text (None is written as an empty element)"""
+    buf += b"<%s>%s</%s>" % (tag, (text or "").translate(_ESCAPES).encode(), tag)
+
+
 class CompaniesHouseXMLGateway:
     """
     UK Companies House XML Gateway Client
@@ -32,9 +49,14 @@ class CompaniesHouseXMLGateway:
     LIVE_URL = "https://xmlgateway.companieshouse.gov.uk/v2-1/schema/1/incorporation.xsd"
     TEST_URL = "https://xmlgw.companieshouse.gov.uk/v2-1/schema/1/incorporation.xsd"
     
+    # Characters fed to the response parser at a time
+    PARSE_CHUNK = 8192
+    
     def __init__(self, presenter_id: str, authentication_code: str, test_mode: bool = True):
         self.presenter_id = presenter_id
         self.authentication_code = authentication_code
+        # The auth code prefix never changes, so hash it once and extend a copy per message
+        self._auth_md5 = hashlib.md5(authentication_code.encode(), usedforsecurity=False)
         self.test_mode = test_mode
         self.endpoint = self.TEST_URL if test_mode else self.LIVE_URL
         
@@ -43,209 +65,197 @@ class CompaniesHouseXMLGateway:
     
     def _generate_digest(self, xml_body: str) -> str:
         """Generate MD5 digest of the XML body"""
-        return hashlib.md5(xml_body.encode()).hexdigest().upper()
+        return hashlib.md5(xml_body.encode(), usedforsecurity=False).hexdigest().upper()
+    
+    def _auth_digest(self, timestamp: str) -> str:
+        """MD5 digest of the authentication code + timestamp"""
+        digest = self._auth_md5.copy()
+        digest.update(timestamp.encode("ascii"))
+        return digest.hexdigest().upper()
     
-    def _build_header(self, transaction_id: str) -> ET.Element:
-        """Build the XML header with authentication"""
+    def _build_header(self, buf: bytearray, transaction_id: str, timestamp: str) -> None:
+        """Write the XML header with authentication"""
         # This is a simplified version - actual implementation
         # requires specific schema based on Companies House documentation
-        header = ET.Element("Header")
+        buf += b"<Header>"
         
         # Sender details
-        sender = ET.SubElement(header, "SenderDetails")
-        id_auth = ET.SubElement(sender, "IDAuthentication")
+        buf += b"<SenderDetails><IDAuthentication>"
         
         # Presenter ID
-        sender_id = ET.SubElement(id_auth, "SenderID")
-        sender_id.text = self.presenter_id
+        _element(buf, b"SenderID", self.presenter_id)
         
         # Authentication method
-        auth = ET.SubElement(id_auth, "Authentication")
-        method = ET.SubElement(auth, "Method")
-        method.text = "MD5"
+        buf += b"<Authentication><Method>MD5</Method>"
         
         # Generate hash of authentication code + timestamp
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        value = ET.SubElement(auth, "Value")
-        value.text = self._generate_digest(self.authentication_code + timestamp)
+        _element(buf, b"Value", self._auth_digest(timestamp))
+        buf += b"</Authentication></IDAuthentication>"
         
         # Timestamp
-        time = ET.SubElement(sender, "TransactionTimestamp")
-        time_attrib = ET.SubElement(time, "DateTime")
-        time_attrib.text = timestamp
+        buf += b"<TransactionTimestamp>"
+        _element(buf, b"DateTime", timestamp)
+        buf += b"</TransactionTimestamp></SenderDetails>"
         
         # Transaction ID
-        transaction = ET.SubElement(header, "TransactionID")
-        transaction.text = transaction_id
+        _element(buf, b"TransactionID", transaction_id)
         
-        return header
+        buf += b"</Header>"
     
-    def _build_incorporation_body(self, company_data: Dict) -> ET.Element:
-        """Build the company incorporation request body"""
-        body = ET.Element("Body")
+    def _build_incorporation_body(self, buf: bytearray, company_data: Dict) -> None:
+        """Write the company incorporation request body"""
+        buf += b"<Body>"
         
         # Incorporation request
-        incorp = ET.SubElement(body, "IncorporationRequest")
+        buf += b"<IncorporationRequest>"
         
-        # Company name
-        company_name = ET.SubElement(incorp, "CompanyName")
-        company_name.text = company_data.get("company_name", "")
+        element = _element
+        get = company_data.get
         
-        # Company type
-        company_type = ET.SubElement(incorp, "CompanyType")
-        company_type.text = company_data.get("company_type", "ltd")
+        # Company name and type
+        element(buf, b"CompanyName", get("company_name", ""))
+        element(buf, b"CompanyType", get("company_type", "ltd"))
         
         # Registered office address
-        address = ET.SubElement(incorp, "RegisteredOfficeAddress")
-        
-        address_line_1 = ET.SubElement(address, "AddressLine1")
-        address_line_1.text = company_data.get("address", {}).get("line_1", "")
-        
-        address_line_2 = ET.SubElement(address, "AddressLine2")
-        address_line_2.text = company_data.get("address", {}).get("line_2", "")
-        
-        locality = ET.SubElement(address, "Locality")
-        locality.text = company_data.get("address", {}).get("locality", "")
-        
-        region = ET.SubElement(address, "Region")
-        region.text = company_data.get("address", {}).get("region", "")
-        
-        postal_code = ET.SubElement(address, "PostalCode")
-        postal_code.text = company_data.get("address", {}).get("postal_code", "")
+        address = get("address", _EMPTY).get
+        buf += b"<RegisteredOfficeAddress>"
+        element(buf, b"AddressLine1", address("line_1", ""))
+        # Optional fields are left out entirely when blank
+        if line_2 := address("line_2"):
+            element(buf, b"AddressLine2", line_2)
+        element(buf, b"Locality", address("locality", ""))
+        if region := address("region"):
+            element(buf, b"Region", region)
+        element(buf, b"PostalCode", address("postal_code", ""))
+        buf += b"</RegisteredOfficeAddress>"
         
         # Directors
-        directors = ET.SubElement(incorp, "Directors")
-        for director in company_data.get("directors", []):
-            dir_elem = ET.SubElement(directors, "Director")
+        buf += b"<Directors>"
+        for director in get("directors", ()):
+            director_get = director.get
+            buf += b"<Director>"
             
             # Name
-            name = ET.SubElement(dir_elem, "Name")
-            forename = ET.SubElement(name, "Forename")
-            forename.text = director.get("forename", "")
-            surname = ET.SubElement(name, "Surname")
-            surname.text = director.get("surname", "")
+            buf += b"<Name>"
+            element(buf, b"Forename", director_get("forename", ""))
+            element(buf, b"Surname", director_get("surname", ""))
+            buf += b"</Name>"
             
             # Date of birth
-            dob = ET.SubElement(dir_elem, "DateOfBirth")
-            dob_year = ET.SubElement(dob, "Year")
-            dob_year.text = director.get("dob_year", "")
-            dob_month = ET.SubElement(dob, "Month")
-            dob_month.text = director.get("dob_month", "")
-            
-            # Nationality
-            nationality = ET.SubElement(dir_elem, "Nationality")
-            nationality.text = director.get("nationality", "")
+            buf += b"<DateOfBirth>"
+            element(buf, b"Year", director_get("dob_year", ""))
+            element(buf, b"Month", director_get("dob_month", ""))
+            buf += b"</DateOfBirth>"
             
-            # Occupation
-            occupation = ET.SubElement(dir_elem, "Occupation")
-            occupation.text = director.get("occupation", "")
+            # Nationality and occupation (optional)
+            if nationality := director_get("nationality"):
+                element(buf, b"Nationality", nationality)
+            if occupation := director_get("occupation"):
+                element(buf, b"Occupation", occupation)
             
             # Address (if different from registered office)
-            if director.get("address"):
-                dir_addr = ET.SubElement(dir_elem, "ResidentialAddress")
-                line1 = ET.SubElement(dir_addr, "AddressLine1")
-                line1.text = director["address"].get("line_1", "")
+            residential = director_get("address")
+            if residential and (line_1 := residential.get("line_1")):
+                buf += b"<ResidentialAddress>"
+                element(buf, b"AddressLine1", line_1)
+                buf += b"</ResidentialAddress>"
+            
+            buf += b"</Director>"
+        buf += b"</Directors>"
         
         # Shareholders / Capital
-        capital = ET.SubElement(incorp, "Shareholders")
-        
-        statement = ET.SubElement(capital, "StatementOfCapital")
-        
-        currency = ET.SubElement(statement, "Currency")
-        currency.text = company_data.get("capital", {}).get("currency", "GBP")
-        
-        total_amount = ET.SubElement(statement, "TotalAmount")
-        total_amount.text = str(company_data.get("capital", {}).get("amount", 100))
+        capital = get("capital", _EMPTY).get
+        buf += b"<Shareholders><StatementOfCapital>"
+        element(buf, b"Currency", capital("currency", "GBP"))
+        element(buf, b"TotalAmount", str(capital("amount", 100)))
+        buf += b"</StatementOfCapital>"
         
         # Shares
-        for share in company_data.get("shares", []):
-            share_class = ET.SubElement(capital, "ShareClass")
-            share_class.text = share.get("class", "ordinary")
-            
-            num_shares = ET.SubElement(capital, "NumberAllotted")
-            num_shares.text = str(share.get("number", 100))
-            
-            prescribed = ET.SubElement(capital, "PrescribedParticulars")
-            prescribed.text = share.get("particulars", "")
-        
-        # SIC Codes
-        sic_codes = ET.SubElement(incorp, "SICCodes")
-        for code in company_data.get("sic_codes", []):
-            sic = ET.SubElement(sic_codes, "SICCode")
-            sic.text = code
+        for share in get("shares", ()):
+            share_get = share.get
+            element(buf, b"ShareClass", share_get("class", "ordinary"))
+            element(buf, b"NumberAllotted", str(share_get("number", 100)))
+            element(buf, b"PrescribedParticulars", share_get("particulars", ""))
+        buf += b"</Shareholders>"
+        
+        # SIC Codes - normally plain digit strings, which need no escaping
+        buf += b"<SICCodes>"
+        for code in get("sic_codes", ()):
+            if code and code.isdigit() and code.isascii():
+                buf += b"<SICCode>" + code.encode("ascii") + b"</SICCode>"
+            else:
+                element(buf, b"SICCode", code)
+        buf += b"</SICCodes>"
         
         # Important: Identity Verification (IDV)
         # As of 2025, Companies House requires IDV for directors
-        idv = ET.SubElement(incorp, "IdentityVerification")
-        idv_status = ET.SubElement(idv, "Status")
-        idv_status.text = "VERIFIED"  # Would need to integrate with IDV provider
+        # (would need to integrate with IDV provider)
+        buf += b"<IdentityVerification><Status>VERIFIED</Status></IdentityVerification>"
         
-        return body
+        buf += b"</IncorporationRequest></Body>"
     
     def build_incorporation_xml(self, company_data: Dict) -> str:
         """Build complete incorporation XML message"""
-        # Generate transaction ID
-        transaction_id = f"INC-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        # Generate transaction ID (sharing the header's timestamp)
+        timestamp = _timestamp()
+        transaction_id = "INC-" + timestamp
         
-        # Build XML structure
-        root = ET.Element("GovTalkMessage")
-        root.set("xmlns", "http://www.govtalk.gov.uk/schemas/govtalk/govtalkheader")
+        # The message shape is fixed, so it is written straight out as
+        # bytes rather than built as a tree and serialized
+        buf = bytearray(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        buf += b'<GovTalkMessage xmlns="http://www.govtalk.gov.uk/schemas/govtalk/govtalkheader">'
         
         # Envelope version
-        env_version = ET.SubElement(root, "EnvelopeVersion")
-        env_version.text = self.envelope_version
+        _element(buf, b"EnvelopeVersion", self.envelope_version)
         
         # Header
-        header = self._build_header(transaction_id)
-        root.append(header)
+        self._build_header(buf, transaction_id, timestamp)
         
-        # GovTalkDetails
-        gov_talk = ET.SubElement(root, "GovTalkDetails")
-        
-        # KeyStore
-        key_store = ET.SubElement(gov_talk, "KeyStore")
-        key = ET.SubElement(key_store, "Key")
-        key.set("Type", "Service")
-        key.text = "Incorporation"
+        # GovTalkDetails / KeyStore
+        buf += b'<GovTalkDetails><KeyStore><Key Type="Service">Incorporation</Key></KeyStore></GovTalkDetails>'
         
         # Body
-        body = self._build_incorporation_body(company_data)
-        root.append(body)
-        
-        # Convert to string
-        xml_str = ET.tostring(root, encoding='unicode')
+        self._build_incorporation_body(buf, company_data)
         
-        # Add XML declaration
-        xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
+        buf += b"</GovTalkMessage>"
         
-        return xml_str, transaction_id
+        return buf.decode(), transaction_id
     
     def parse_response(self, response_xml: str) -> Dict:
         """Parse Companies House XML response"""
+        # Stream the response and stop at the end of the first Body rather
+        # than building the whole tree and searching it
+        parser = ET.XMLPullParser(events=("start", "end"))
+        in_body = False
+        ack = None
         try:
-            root = ET.fromstring(response_xml)
-            
-            # Extract status
-            body = root.find(".//Body")
-            if body is not None:
-                # Check for errors
-                error = body.find(".//Error")
-                if error is not None:
-                    return {
-                        "status": "error",
-                        "error_code": error.findtext("ErrorCode", "UNKNOWN"),
-                        "error_message": error.findtext("ErrorMessage", "Unknown error")
-                    }
-                
-                # Check for acceptance
-                ack = body.find(".//Acknowledgement")
-                if ack is not None:
-                    return {
-                        "status": "accepted",
-                        "transaction_id": ack.findtext("TransactionID", ""),
-                        "incorporation_number": ack.findtext("IncorporationNumber", ""),
-                        "company_number": ack.findtext("CompanyNumber", "")
-                    }
+            for offset in range(0, len(response_xml), self.PARSE_CHUNK):
+                parser.feed(response_xml[offset:offset + self.PARSE_CHUNK])
+                for event, elem in parser.read_events():
+                    tag = elem.tag
+                    if event == "start":
+                        if tag == "Body":
+                            in_body = True
+                        continue
+                    if not in_body:
+                        elem.clear()
+                    elif tag == "Error":
+                        # Errors win over an acknowledgement in the same body
+                        return {
+                            "status": "error",
+                            "error_code": elem.findtext("ErrorCode", "UNKNOWN"),
+                            "error_message": elem.findtext("ErrorMessage", "Unknown error")
+                        }
+                    elif tag == "Acknowledgement" and ack is None:
+                        ack = {
+                            "status": "accepted",
+                            "transaction_id": elem.findtext("TransactionID", ""),
+                            "incorporation_number": elem.findtext("IncorporationNumber", ""),
+                            "company_number": elem.findtext("CompanyNumber", "")
+                        }
+                    elif tag == "Body":
+                        return ack or {"status": "unknown", "raw": response_xml}
+            parser.close()
             
             return {"status": "unknown", "raw": response_xml}
             
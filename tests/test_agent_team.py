@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from app.agents.team import WORKER_CONCURRENCY, AgentRole, AgentTask, AgentTeam
+
+
+def _payment(task_id: str, amount) -> AgentTask:
+    return AgentTask(
+        task_id=task_id,
+        agent_role=AgentRole.PAYMENT,
+        description="process_payment",
+        metadata={"amount": amount}
+    )
+
+
+class WorkerPoolTest(unittest.IsolatedAsyncioTestCase):
+    """Per-role worker pools and their bounded queues"""
+    
+    async def asyncSetUp(self):
+        self.team = AgentTeam()
+        self.gate = asyncio.Event()
+        self.running = 0
+        self.peak = 0
+        agent = self.team.agents[AgentRole.SALES]
+        execute = agent._execute_task
+        
+        async def gated(task):
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            await self.gate.wait()
+            self.running -= 1
+            return await execute(task)
+        
+        agent._execute_task = gated
+    
+    def _sales(self, task_id: str) -> AgentTask:
+        return AgentTask(task_id=task_id, agent_role=AgentRole.SALES, description="handle_inquiry")
+    
+    async def _settle(self):
+        for _ in range(20):
+            await asyncio.sleep(0)
+    
+    async def test_concurrency_is_bounded_per_role(self):
+        calls = [asyncio.create_task(self.team.process_task(AgentRole.SALES, self._sales(f"S{i}"))) for i in range(20)]
+        await self._settle()
+        self.assertEqual(self.running, WORKER_CONCURRENCY)
+        self.gate.set()
+        results = await asyncio.gather(*calls)
+        self.assertEqual(self.peak, WORKER_CONCURRENCY)
+        self.assertTrue(all("response" in result for result in results))
+    
+    async def test_burst_applies_backpressure(self):
+        capacity = WORKER_CONCURRENCY * 4
+        calls = [
+            asyncio.create_task(self.team.process_task(AgentRole.SALES, self._sales(f"S{i}")))
+            for i in range(WORKER_CONCURRENCY + capacity + 10)
+        ]
+        await self._settle()
+        queue = self.team._queues[AgentRole.SALES]
+        self.assertEqual(queue.qsize(), capacity)
+        self.assertTrue(queue.full())
+        self.gate.set()
+        results = await asyncio.gather(*calls)
+        self.assertEqual(len(results), len(calls))
+    
+    async def test_busy_role_does_not_block_others(self):
+        busy = [asyncio.create_task(self.team.process_task(AgentRole.SALES, self._sales(f"S{i}"))) for i in range(10)]
+        await self._settle()
+        task = AgentTask(task_id="F1", agent_role=AgentRole.SUPPORT, description="faq")
+        result = await asyncio.wait_for(self.team.process_task(AgentRole.SUPPORT, task), 1)
+        self.assertIn("answer", result)
+        self.gate.set()
+        await asyncio.gather(*busy)
+
+
+class PaymentBatcherTest(unittest.IsolatedAsyncioTestCase):
+    """Payments confirmed through PaymentAgent's batcher"""
+    
+    async def asyncSetUp(self):
+        self.team = AgentTeam()
+    
+    async def test_batch_results_follow_their_tasks(self):
+        results = await asyncio.gather(*(
+            self.team.process_task(AgentRole.PAYMENT, _payment(f"P{i}", i))
+            for i in range(40)
+        ))
+        self.assertEqual([r["amount"] for r in results], list(range(40)))
+        self.assertEqual(len({r["transaction_id"] for r in results}), 40)
+    
+    async def test_bad_payment_fails_alone(self):
+        good, bad = await asyncio.gather(
+            self.team.process_task(AgentRole.PAYMENT, _payment("GOOD", 10)),
+            self.team.process_task(AgentRole.PAYMENT, _payment("BAD", "abc"))
+        )
+        self.assertEqual(good["status"], "confirmed")
+        self.assertEqual(good["amount"], 10)
+        self.assertIn("error", bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
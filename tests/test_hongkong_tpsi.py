@@ -0,0 +1,54 @@
+import unittest
+
+from app.services.hongkong_tpsi import HongKongTPSI
+
+
+class IncorporationXMLTest(unittest.TestCase):
+    """Null leaf values in the incorporation payload"""
+    
+    def setUp(self):
+        self.tpsi = HongKongTPSI(test_mode=True)
+        self.company_data = {
+            "company_name": "Null Director Ltd",
+            "directors": [{"name": None, "nationality": "Hong Kong"}],
+            "shareholders": [{"name": "Shareholder", "shares": 100}],
+            "registered_address": {"district": "Central"}
+        }
+    
+    def test_null_director_name_renders_empty(self):
+        xml = self.tpsi._build_incorporation_xml(self.company_data, "TX-1")
+        self.assertIn("<Director><Type>individual</Type><Name></Name>", xml)
+    
+    def test_incorporate_accepts_null_director_name(self):
+        result = self.tpsi.incorporate_company(self.company_data)
+        self.assertEqual(result["status"], "success")
+        self.assertTrue(result["xml_generated"])
+
+
+
+class CompanyDetailsCacheTest(unittest.TestCase):
+    """The per-client get_company_details cache"""
+    
+    def setUp(self):
+        self.tpsi = HongKongTPSI(test_mode=True)
+    
+    def test_results_do_not_share_nested_records(self):
+        first = self.tpsi.get_company_details("12345678")
+        first["registered_address"]["district"] = "Changed"
+        first["directors"].append({"name": "Intruder"})
+        second = self.tpsi.get_company_details("12345678")
+        self.assertEqual(second["registered_address"]["district"], "Central and Western")
+        self.assertEqual(len(second["directors"]), 1)
+    
+    def test_refreshed_entry_is_evicted_last(self):
+        cache = self.tpsi._company_details
+        self.tpsi.get_company_details("A")
+        self.tpsi.get_company_details("B")
+        # Expire A so the next lookup refreshes it
+        cache["A"] = (cache["A"][0] - self.tpsi.COMPANY_CACHE_TTL - 1, cache["A"][1])
+        self.tpsi.get_company_details("A")
+        self.assertEqual(list(cache), ["B", "A"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import hashlib
+import hmac
+import json
+import unittest
+from types import SimpleNamespace
+
+try:
+    import main
+except ImportError:  # main imports the Workers runtime's `workers` module
+    raise unittest.SkipTest("workers runtime not available")
+
+
+class _Headers(dict):
+    """Case-insensitive header lookup, as on a Workers request"""
+    
+    def get(self, name, default=None):
+        name = name.lower()
+        for key, value in self.items():
+            if key.lower() == name:
+                return value
+        return default
+
+
+class _Request:
+    """The parts of a Workers request that the handlers read"""
+    
+    def __init__(self, method: str, path: str, body: str = None, headers: dict = None):
+        self.method = method
+        self.url = "https://api.opencompanybot.com" + path
+        self.headers = _Headers(headers or {})
+        self._body = body
+    
+    async def text(self) -> str:
+        return self._body or ""
+
+
+class WorkerTestCase(unittest.IsolatedAsyncioTestCase):
+    """Calls Default.fetch directly with a given environment"""
+    
+    env = {}
+    
+    async def fetch(self, method: str, path: str, body: str = None, headers: dict = None):
+        worker = main.Default.__new__(main.Default)
+        worker.env = SimpleNamespace(**self.env)
+        response = await worker.fetch(_Request(method, path, body, headers), worker.env)
+        text = await response.text() if response.status != 304 else ""
+        return response, text
+
+
+class StaticResponseTest(WorkerTestCase):
+    """ETag revalidation of the pre-serialized GET bodies"""
+    
+    async def test_matching_etag_gets_304(self):
+        for path in ("/", "/api/v1/providers", "/api/v1/countries", "/api/v1/countries/hk", "/api/v1/requirements?country=sg"):
+            with self.subTest(path=path):
+                response, body = await self.fetch("GET", path)
+                self.assertEqual(response.status, 200)
+                self.assertTrue(body)
+                etag = response.headers.get("ETag")
+                revalidated, _ = await self.fetch("GET", path, headers={"If-None-Match": etag})
+                self.assertEqual(revalidated.status, 304)
+                self.assertEqual(revalidated.headers.get("ETag"), etag)
+    
+    async def test_stale_etag_gets_body(self):
+        response, body = await self.fetch("GET", "/api/v1/providers", headers={"If-None-Match": '"stale"'})
+        self.assertEqual(response.status, 200)
+        self.assertIn("providers", json.loads(body))
+
+
+class CorsTest(WorkerTestCase):
+    """Access-Control-Allow-Origin against a CORS_ORIGINS allowlist"""
+    
+    env = {"CORS_ORIGINS": "https://opencompanybot.com, https://app.opencompanybot.com"}
+    
+    async def test_allowed_origin_is_echoed(self):
+        response, _ = await self.fetch("GET", "/health", headers={"Origin": "https://app.opencompanybot.com"})
+        self.assertEqual(response.headers.get("Access-Control-Allow-Origin"), "https://app.opencompanybot.com")
+        self.assertEqual(response.headers.get("Vary"), "Origin")
+    
+    async def test_other_origin_is_not_allowed(self):
+        response, _ = await self.fetch("GET", "/health", headers={"Origin": "https://evil.example"})
+        self.assertIsNone(response.headers.get("Access-Control-Allow-Origin"))
+        self.assertEqual(response.headers.get("Vary"), "Origin")
+    
+    async def test_preflight_uses_the_same_allowlist(self):
+        response, _ = await self.fetch("OPTIONS", "/api/v1/orders", headers={"Origin": "https://opencompanybot.com"})
+        self.assertEqual(response.status, 204)
+        self.assertEqual(response.headers.get("Access-Control-Allow-Origin"), "https://opencompanybot.com")
+        self.assertIsNotNone(response.headers.get("Access-Control-Allow-Methods"))
+    
+    async def test_wildcard_allows_any_origin(self):
+        self.env = {}
+        response, _ = await self.fetch("GET", "/health", headers={"Origin": "https://anywhere.example"})
+        self.assertEqual(response.headers.get("Access-Control-Allow-Origin"), "*")
+
+
+class RoutingTest(WorkerTestCase):
+    """Dispatch through the static, method, any-method and prefix route tables"""
+    
+    async def test_routes(self):
+        cases = (
+            ("GET", "/health", 200),
+            ("GET", "/api/v1/countries/sg", 200),
+            ("GET", "/api/v1/countries/zz", 404),
+            ("POST", "/api/v1/agents/faq", 404),
+            ("POST", "/api/v1/agents/support", 200),
+            ("GET", "/api/v1/agents/support", 404),
+            ("GET", "/nope", 404)
+        )
+        for method, path, status in cases:
+            with self.subTest(method=method, path=path):
+                response, _ = await self.fetch(method, path, "{}" if method == "POST" else None)
+                self.assertEqual(response.status, status)
+
+
+class PaymentWebhookTest(WorkerTestCase):
+    """POST /api/v1/payments/webhook signature checks and dedupe"""
+    
+    env = {"PAYMENT_WEBHOOK_SECRET": "whsec"}
+    
+    def setUp(self):
+        main._webhooks_seen.clear()
+    
+    async def post(self, payload, signature: str = None):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        if signature is None:
+            signature = hmac.new(b"whsec", body.encode(), hashlib.sha256).hexdigest()
+        return await self.fetch("POST", "/api/v1/payments/webhook", body, {"X-Signature": signature})
+    
+    async def test_bad_signature_is_rejected(self):
+        response, _ = await self.post({"order_id": "ORD-1", "event_id": "evt_1"}, signature="0" * 64)
+        self.assertEqual(response.status, 401)
+    
+    async def test_redelivery_is_acknowledged_once(self):
+        payload = {"order_id": "ORD-1", "event_id": "evt_1", "status": "paid"}
+        _, first = await self.post(payload)
+        _, second = await self.post(payload)
+        self.assertEqual(json.loads(first)["message"], "Webhook received")
+        self.assertEqual(json.loads(second)["message"], "Duplicate webhook ignored")
+    
+    async def test_deliveries_without_event_id_are_not_deduplicated(self):
+        payload = {"order_id": "ORD-1", "status": "paid"}
+        await self.post(payload)
+        _, second = await self.post(payload)
+        self.assertEqual(json.loads(second)["message"], "Webhook received")
+    
+    async def test_malformed_bodies_are_rejected(self):
+        for payload in ("[1]", "null", {"order_id": ["ORD-1"]}, {"event_id": {"id": 1}}, {"status": [None]}):
+            with self.subTest(payload=payload):
+                response, _ = await self.post(payload)
+                self.assertEqual(response.status, 400)
+
+
+
+class BodySizeTest(WorkerTestCase):
+    """MAX_BODY_SIZE applies with or without a Content-Length header"""
+    
+    async def test_announced_oversized_body_is_refused(self):
+        body = json.dumps({"company_name": "x" * main.MAX_BODY_SIZE})
+        response, _ = await self.fetch("POST", "/api/v1/hk/tpsi/name-search", body, {"Content-Length": str(len(body))})
+        self.assertEqual(response.status, 413)
+    
+    async def test_unannounced_oversized_body_is_refused(self):
+        # Multi-byte characters: the limit is on bytes, not characters
+        body = json.dumps({"company_name": "é" * (main.MAX_BODY_SIZE // 2)}, ensure_ascii=False)
+        response, _ = await self.fetch("POST", "/api/v1/hk/tpsi/name-search", body)
+        self.assertEqual(response.status, 413)
+    
+    async def test_body_under_the_limit_is_handled(self):
+        body = json.dumps({"company_name": "é" * (main.MAX_BODY_SIZE // 4)}, ensure_ascii=False)
+        response, _ = await self.fetch("POST", "/api/v1/hk/tpsi/name-search", body)
+        self.assertEqual(response.status, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()